@@ -1,4 +1,5 @@
 from __future__ import annotations
+import sys
 from collections.abc import Callable, Iterable
 from typing import TYPE_CHECKING, Optional, Any, overload
 
@@ -34,7 +35,8 @@ class ItemInfo:
         else:
             (item_type, progressive, item_id, special) = item_table[name]
 
-        self.name: str = name
+        # Interned so names compare by identity with the interned plandomizer keys; Items share this string
+        self.name: str = sys.intern(name)
         self.advancement: bool = (progressive is True)
         self.priority: bool = (progressive is False)
         self.type: str = item_type
@@ -78,13 +80,13 @@ for item_name in item_table:
 
 class Item:
     def __init__(self, name: str = '', world: Optional[World] = None, event: bool = False) -> None:
-        self.name: str = name
         self.location: Optional[Location] = None
         self.event: bool = event
         if event:
             if name not in ItemInfo.events:
                 ItemInfo.events[name] = ItemInfo(name, event=True)
         self.info: ItemInfo = ItemInfo.events[name] if event else ItemInfo.items[name]
+        self.name: str = self.info.name
         self.price: Optional[int] = self.info.special.get('price', None)
         self.world: Optional[World] = world
         self.looks_like_item: Optional[Item] = None
@@ -962,11 +962,11 @@ def get_pool_core(world: World) -> tuple[list[str], dict[str, Item]]:
         # Disabled locations use the #Junk group for fill.
         # Update pattern matcher since all normal junk is removed.
         item_groups['Junk'] = remove_junk_ludicrous_items
-        world.distribution.distribution.search_groups['Junk'] = remove_junk_ludicrous_items
+        world.distribution.distribution.set_search_group('Junk', remove_junk_ludicrous_items)
     else:
         # Fix for unit tests reusing globals after ludicrous pool mutates them
         item_groups['Junk'] = remove_junk_items
-        world.distribution.distribution.search_groups['Junk'] = remove_junk_items
+        world.distribution.distribution.set_search_group('Junk', remove_junk_items)
 
     world.distribution.collect_starters(world.state)
 
@@ -2,7 +2,7 @@ from __future__ import annotations
 import json
 from collections.abc import Sequence
 from functools import reduce
-from typing import Optional
+from typing import Optional, TextIO
 
 INDENT = '  '
 
@@ -37,8 +37,15 @@ def is_dict(value) -> bool:
     return isinstance(value, dict)
 
 
+# json.dumps builds a new encoder on every call with non-default arguments, and dump_scalar is called for every key and value
+scalar_encoders: dict[bool, json.JSONEncoder] = {
+    False: json.JSONEncoder(ensure_ascii=False),
+    True: json.JSONEncoder(ensure_ascii=True),
+}
+
+
 def dump_scalar(obj, ensure_ascii: bool = False) -> str:
-    return json.dumps(obj, ensure_ascii=ensure_ascii)
+    return scalar_encoders[ensure_ascii].encode(obj)
 
 
 def dump_list(obj: list, current_indent: str = '', ensure_ascii: bool = False) -> str:
@@ -129,3 +136,25 @@ def dump_obj(obj, current_indent: str = '', sub_width: Optional[Sequence[int, in
         return dump_dict(obj, current_indent, sub_width, ensure_ascii)
     else:
         return dump_scalar(obj, ensure_ascii)
+
+
+def write_obj(obj, outfile: TextIO, ensure_ascii: bool = False) -> None:
+    # Writes the same text as dump_obj, but a plain top-level dict is written one entry at a time so the whole document is never joined into a single string
+    if type(obj) is not dict or len(obj) == 0:
+        outfile.write(dump_obj(obj, ensure_ascii=ensure_ascii))
+        return
+
+    keys = [dump_scalar(str(key), ensure_ascii) for key in obj]
+    key_width = max(len(key) for key in keys)
+
+    outfile.write('{\n')
+    for index, (key, value) in enumerate(zip(keys, obj.values())):
+        if index > 0:
+            outfile.write(',\n')
+        outfile.write('{indent}{key:{padding}}{value}'.format(
+            key='{key}:'.format(key=key),
+            value=dump_obj(value, INDENT, ensure_ascii=ensure_ascii),
+            indent=INDENT,
+            padding=key_width + 2,
+        ))
+    outfile.write('\n}')
@@ -1,5 +1,6 @@
 from __future__ import annotations
 import logging
+import sys
 from collections.abc import Callable, Iterable
 from enum import Enum
 from typing import TYPE_CHECKING, Optional, Any, overload
@@ -26,7 +27,7 @@ class Location:
     def __init__(self, name: str = '', address: LocationAddress = None, address2: LocationAddress = None, default: LocationDefault = None,
                  location_type: str = 'Chest', scene: Optional[int] = None, parent: Optional[Region] = None,
                  filter_tags: LocationFilterTags = None, internal: bool = False, vanilla_item: Optional[str] = None) -> None:
-        self.name: str = name
+        self.name: str = sys.intern(name)
         self.parent_region: Optional[Region] = parent
         self.item: Optional[Item] = None
         self.vanilla_item: Optional[str] = vanilla_item
@@ -173,7 +174,8 @@ def LocationFactory(locations: str | list[str]) -> Location | list[Location]:
         if location in location_table:
             match_location = location
         else:
-            match_location = next(filter(lambda k: k.lower() == location.lower(), location_table), None)
+            location_lower = location.lower()
+            match_location = next(filter(lambda k: k.lower() == location_lower, location_table), None)
         if match_location:
             type, scene, default, addresses, vanilla_item, filter_tags = location_table[match_location]
             if addresses is None:
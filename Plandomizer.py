@@ -1,12 +1,11 @@
 from __future__ import annotations
 import itertools
 import json
-import math
 import re
 import random
-from collections import defaultdict
+import sys
+from collections import Counter, defaultdict
 from collections.abc import Callable, Iterable, Sequence
-from functools import reduce
 from typing import TYPE_CHECKING, Any, Optional
 
 import StartingItems
@@ -14,10 +13,10 @@ from Entrance import Entrance
 from EntranceShuffle import EntranceShuffleError, change_connections, confirm_replacement, validate_world, check_entrances_compatibility
 from Fill import FillError
 from Hints import HintArea, gossipLocations, GossipText
-from Item import ItemFactory, ItemInfo, ItemIterator, is_item, Item
+from Item import ItemFactory, ItemInfo, is_item, Item
 from ItemPool import item_groups, get_junk_item, song_list, trade_items, child_trade_items
-from JSONDump import dump_obj, CollapseList, CollapseDict, AlignedDict, SortedDict
-from Location import Location, LocationIterator, LocationFactory
+from JSONDump import dump_obj, write_obj, CollapseList, CollapseDict, AlignedDict, SortedDict
+from Location import Location, LocationFactory
 from LocationList import location_groups, location_table
 from Search import Search
 from SettingsList import build_close_match, validate_settings
@@ -51,10 +50,29 @@ per_world_keys = (
     'gossip_stones',
 )
 
+# Hashed views of the item groups checked for every record placed by fill
+bottle_group = frozenset(item_groups['Bottle'])
+adult_trade_group = frozenset(item_groups['AdultTrade'])
+child_trade_group = frozenset(item_groups['ChildTrade'])
+dungeon_reward_group = frozenset(item_groups['DungeonReward'])
+song_group = frozenset(song_list)
+# Position of each trade item in its trade sequence
+trade_item_index = {name: index for (index, name) in enumerate(trade_items)}
+child_trade_item_index = {name: index for (index, name) in enumerate(child_trade_items)}
+# Choices dropped from a list record once the item pool has run out of them
+limited_choices = frozenset(('#ChildTrade', '#AdultTrade', '#Bottle')) | bottle_group | adult_trade_group | child_trade_group
+# Ammo table per starting inventory item name, every upgrade entry of an item carries the same table so the first one is kept
+inventory_ammo = {}
+for inventory_item in StartingItems.inventory.values():
+    if inventory_item.ammo:
+        inventory_ammo.setdefault(inventory_item.item_name, inventory_item.ammo)
+
 
 class Record:
-    def __init__(self, properties: Optional[dict[str, Any]] = None, src_dict: Optional[dict[str, Any]] = None) -> None:
-        self.properties: dict[str, Any] = properties if properties is not None else getattr(self, "properties")
+    __slots__ = ()
+    properties: dict[str, Any] = {}
+
+    def __init__(self, src_dict: Optional[dict[str, Any]] = None) -> None:
         if src_dict is not None:
             self.update(src_dict, update_all=True)
 
@@ -68,13 +86,15 @@ class Record:
                 setattr(self, k, src_dict.get(k, p))
 
     def to_json(self) -> dict[str, Any]:
-        return {k: getattr(self, k) for (k, d) in self.properties.items() if getattr(self, k) != d}
+        return {k: v for (k, d) in self.properties.items() if (v := getattr(self, k)) != d}
 
     def __str__(self) -> str:
         return dump_obj(self.to_json())
 
 
 class DungeonRecord(Record):
+    __slots__ = ('mq',)
+    properties: dict[str, Any] = {'mq': None}
     mapping: dict[str, Optional[bool]] = {
         'random': None,
         'mq': True,
@@ -86,7 +106,7 @@ class DungeonRecord(Record):
 
         if isinstance(src_dict, str):
             src_dict = {'mq': self.mapping.get(src_dict, None)}
-        super().__init__({'mq': None}, src_dict)
+        super().__init__(src_dict)
 
     def to_json(self) -> str:
         if self.mq is None:
@@ -95,6 +115,9 @@ class DungeonRecord(Record):
 
 
 class EmptyDungeonRecord(Record):
+    __slots__ = ('empty',)
+    properties: dict[str, Any] = {'empty': None}
+
     def __init__(self, src_dict: Optional[bool | str | dict[str, Optional[bool]]] = 'random') -> None:
         self.empty: Optional[bool] = None
 
@@ -102,18 +125,21 @@ class EmptyDungeonRecord(Record):
             src_dict = {'empty': None}
         elif isinstance(src_dict, bool):
             src_dict = {'empty': src_dict}
-        super().__init__({'empty': None}, src_dict)
+        super().__init__(src_dict)
 
     def to_json(self) -> Optional[bool]:
         return self.empty
 
 
 class GossipRecord(Record):
+    __slots__ = ('text', 'colors', 'hinted_locations', 'hinted_items')
+    properties: dict[str, Any] = {'text': None, 'colors': None, 'hinted_locations': None, 'hinted_items': None}
+
     def __init__(self, src_dict: dict[str, Any]) -> None:
         self.colors: Optional[Sequence[str]] = None
         self.hinted_locations: Optional[Sequence[str]] = None
         self.hinted_items: Optional[Sequence[str]] = None
-        super().__init__({'text': None, 'colors': None, 'hinted_locations': None, 'hinted_items': None}, src_dict)
+        super().__init__(src_dict)
 
     def to_json(self) -> dict[str, Any]:
         if self.colors is not None:
@@ -126,13 +152,16 @@ class GossipRecord(Record):
 
 
 class ItemPoolRecord(Record):
+    __slots__ = ('type', 'count')
+    properties: dict[str, Any] = {'type': 'set', 'count': 1}
+
     def __init__(self, src_dict: int | dict[str, int] = 1) -> None:
         self.type: str = 'set'
         self.count: int = 1
 
         if isinstance(src_dict, int):
             src_dict = {'count': src_dict}
-        super().__init__({'type': 'set', 'count': 1}, src_dict)
+        super().__init__(src_dict)
 
     def to_json(self) -> int | CollapseDict:
         if self.type == 'set':
@@ -149,13 +178,19 @@ class ItemPoolRecord(Record):
 
 
 class LocationRecord(Record):
+    __slots__ = ('item', 'player', 'price', 'model')
+    properties: dict[str, Any] = {'item': None, 'player': None, 'price': None, 'model': None}
+
     def __init__(self, src_dict: dict[str, Any] | str) -> None:
         self.item: Optional[str | list[str]] = None
         self.player: Optional[int] = None
 
         if isinstance(src_dict, str):
             src_dict = {'item': src_dict}
-        super().__init__({'item': None, 'player': None, 'price': None, 'model': None}, src_dict)
+        super().__init__(src_dict)
+        # Item names repeat across locations and worlds, share a single copy of each
+        if isinstance(self.item, str):
+            self.item = sys.intern(self.item)
 
     def to_json(self) -> str | CollapseDict:
         self_dict = super().to_json()
@@ -171,15 +206,19 @@ class LocationRecord(Record):
         else:
             player = None if item.location is not None and item.world is item.location.world else (item.world.id + 1)
 
-        return LocationRecord({
-            'item': item.name,
-            'player': player,
-            'model': item.looks_like_item.name if item.looks_like_item is not None and item.location.has_preview() and can_cloak(item, item.looks_like_item) else None,
-            'price': item.location.price,
-        })
+        # Every property is known here, so skip the generic src_dict handling of __init__ and update
+        record = object.__new__(LocationRecord)
+        record.item = item.name
+        record.player = player
+        record.model = item.looks_like_item.name if item.looks_like_item is not None and item.location.has_preview() and can_cloak(item, item.looks_like_item) else None
+        record.price = item.location.price
+        return record
 
 
 class EntranceRecord(Record):
+    __slots__ = ('region', 'origin')
+    properties: dict[str, Any] = {'region': None, 'origin': None}
+
     def __init__(self, src_dict: dict[str, Optional[str]] | str) -> None:
         self.region: Optional[str] = None
         self.origin: Optional[str] = None
@@ -189,7 +228,11 @@ class EntranceRecord(Record):
         if 'from' in src_dict:
             src_dict['origin'] = src_dict['from']
             del src_dict['from']
-        super().__init__({'region': None, 'origin': None}, src_dict)
+        super().__init__(src_dict)
+        if self.region is not None:
+            self.region = sys.intern(self.region)
+        if self.origin is not None:
+            self.origin = sys.intern(self.origin)
 
     def to_json(self) -> str | CollapseDict:
         self_dict = super().to_json()
@@ -213,12 +256,15 @@ class EntranceRecord(Record):
 
 
 class StarterRecord(Record):
+    __slots__ = ('count',)
+    properties: dict[str, Any] = {'count': 1}
+
     def __init__(self, src_dict: int = 1) -> None:
         self.count: int = 1
 
         if isinstance(src_dict, int):
             src_dict = {'count': src_dict}
-        super().__init__({'count': 1}, src_dict)
+        super().__init__(src_dict)
 
     def copy(self) -> StarterRecord:
         return StarterRecord(self.count)
@@ -228,6 +274,8 @@ class StarterRecord(Record):
 
 
 class TrialRecord(Record):
+    __slots__ = ('active',)
+    properties: dict[str, Any] = {'active': None}
     mapping: dict[str, Optional[bool]] = {
         'random': None,
         'active': True,
@@ -239,7 +287,7 @@ class TrialRecord(Record):
 
         if isinstance(src_dict, str):
             src_dict = {'active': self.mapping.get(src_dict, None)}
-        super().__init__({'active': None}, src_dict)
+        super().__init__(src_dict)
 
     def to_json(self) -> str:
         if self.active is None:
@@ -248,12 +296,15 @@ class TrialRecord(Record):
 
 
 class SongRecord(Record):
+    __slots__ = ('notes',)
+    properties: dict[str, Any] = {'notes': None}
+
     def __init__(self, src_dict: Optional[str | dict[str, Optional[str]]] = None) -> None:
         self.notes: Optional[str] = None
 
         if src_dict is None or isinstance(src_dict, str):
             src_dict = {'notes': src_dict}
-        super().__init__({'notes': None}, src_dict)
+        super().__init__(src_dict)
 
     def to_json(self) -> str:
         return self.notes
@@ -276,8 +327,10 @@ class WorldDistribution:
 
         self.distribution: Distribution = distribution
         self.id: int = id
-        self.base_pool: list[str] = []
-        self.major_group: list[str] = []
+        self.base_pool: Counter[str] = Counter()
+        self.major_group: frozenset[str] = frozenset()
+        self.pattern_cache: dict[str | tuple[str, ...], Callable[[str], bool]] = {}
+        self.pattern_locations_cache: dict[str, list[str]] = {}
         self.song_as_items: bool = False
         self.skipped_locations: list[Location] = []
         self.effective_starting_items: dict[str, StarterRecord] = {}
@@ -286,27 +339,28 @@ class WorldDistribution:
         self.update(src_dict, update_all=True)
 
     def update(self, src_dict: dict[str, Any], update_all: bool = False) -> None:
-        update_dict = {
-            'randomized_settings': {name: record for (name, record) in src_dict.get('randomized_settings', {}).items()},
-            'dungeons': {name: DungeonRecord(record) for (name, record) in src_dict.get('dungeons', {}).items()},
-            'empty_dungeons': {name: EmptyDungeonRecord(record) for (name, record) in src_dict.get('empty_dungeons', {}).items()},
-            'trials': {name: TrialRecord(record) for (name, record) in src_dict.get('trials', {}).items()},
-            'songs': {name: SongRecord(record) for (name, record) in src_dict.get('songs', {}).items()},
-            'item_pool': {name: ItemPoolRecord(record) for (name, record) in src_dict.get('item_pool', {}).items()},
-            'entrances': {name: EntranceRecord(record) for (name, record) in src_dict.get('entrances', {}).items()},
-            'locations': {name: [LocationRecord(rec) for rec in record] if is_pattern(name) else LocationRecord(record) for (name, record) in src_dict.get('locations', {}).items() if not is_output_only(name)},
-            'woth_locations': None,
-            'goal_locations': None,
-            'barren_regions': None,
-            'gossip_stones': {name: [GossipRecord(rec) for rec in record] if is_pattern(name) else GossipRecord(record) for (name, record) in src_dict.get('gossip_stones', {}).items()},
+        # Only build records for the keys that are actually being updated
+        update_dict: dict[str, Callable[[dict[str, Any]], Any]] = {
+            'randomized_settings': lambda entries: {name: record for (name, record) in entries.items()},
+            'dungeons': lambda entries: {name: DungeonRecord(record) for (name, record) in entries.items()},
+            'empty_dungeons': lambda entries: {name: EmptyDungeonRecord(record) for (name, record) in entries.items()},
+            'trials': lambda entries: {name: TrialRecord(record) for (name, record) in entries.items()},
+            'songs': lambda entries: {name: SongRecord(record) for (name, record) in entries.items()},
+            'item_pool': lambda entries: {sys.intern(name): ItemPoolRecord(record) for (name, record) in entries.items()},
+            'entrances': lambda entries: {sys.intern(name): EntranceRecord(record) for (name, record) in entries.items()},
+            'locations': lambda entries: {sys.intern(name): [LocationRecord(rec) for rec in record] if is_pattern(name) else LocationRecord(record) for (name, record) in entries.items() if not is_output_only(name)},
+            'woth_locations': lambda entries: None,
+            'goal_locations': lambda entries: None,
+            'barren_regions': lambda entries: None,
+            'gossip_stones': lambda entries: {sys.intern(name): [GossipRecord(rec) for rec in record] if is_pattern(name) else GossipRecord(record) for (name, record) in entries.items()},
         }
 
         if update_all:
-            self.__dict__.update(update_dict)
+            self.__dict__.update({k: build(src_dict.get(k, {})) for (k, build) in update_dict.items()})
         else:
             for k in src_dict:
                 if k in update_dict:
-                    value = update_dict[k]
+                    value = update_dict[k](src_dict[k])
                     if self.__dict__.get(k, None) is None:
                         setattr(self, k, value)
                     elif isinstance(value, dict):
@@ -316,8 +370,8 @@ class WorldDistribution:
                     else:
                         setattr(self, k, None)
 
-    def to_json(self) -> dict[str, Any]:
-        return {
+    def to_json(self, include_output: bool = True) -> dict[str, Any]:
+        self_dict = {
             'randomized_settings': self.randomized_settings,
             'dungeons': {name: record.to_json() for (name, record) in self.dungeons.items()},
             'empty_dungeons': {name: record.to_json() for (name, record) in self.empty_dungeons.items()},
@@ -325,23 +379,45 @@ class WorldDistribution:
             'songs': {name: record.to_json() for (name, record) in self.songs.items()},
             'item_pool': SortedDict({name: record.to_json() for (name, record) in self.item_pool.items()}),
             'entrances': {name: record.to_json() for (name, record) in self.entrances.items()},
-            'locations': {name: [rec.to_json() for rec in record] if is_pattern(name) else record.to_json() for (name, record) in self.locations.items()},
-            ':skipped_locations': {loc.name: LocationRecord.from_item(loc.item).to_json() for loc in self.skipped_locations},
-            ':woth_locations': None if self.woth_locations is None else {name: record.to_json() for (name, record) in self.woth_locations.items()},
-            ':goal_locations': self.goal_locations,
-            ':barren_regions': self.barren_regions,
-            'gossip_stones': SortedDict({name: [rec.to_json() for rec in record] if is_pattern(name) else record.to_json() for (name, record) in self.gossip_stones.items()}),
+            'locations': {name: [rec.to_json() for rec in record] if isinstance(record, list) else record.to_json() for (name, record) in self.locations.items()},
         }
+        # Output-only entries would be stripped again right away, so don't build them at all
+        if include_output:
+            self_dict.update({
+                ':skipped_locations': {loc.name: LocationRecord.from_item(loc.item).to_json() for loc in self.skipped_locations},
+                ':woth_locations': None if self.woth_locations is None else {name: record.to_json() for (name, record) in self.woth_locations.items()},
+                ':goal_locations': self.goal_locations,
+                ':barren_regions': self.barren_regions,
+            })
+        self_dict['gossip_stones'] = SortedDict({name: [rec.to_json() for rec in record] if isinstance(record, list) else record.to_json() for (name, record) in self.gossip_stones.items()})
+        return self_dict
 
     def __str__(self) -> str:
         return dump_obj(self.to_json())
 
     def pattern_matcher(self, pattern: str | list[str]) -> Callable[[str], bool]:
+        # Patterns are reused heavily while altering the pool and filling, so only parse each one once
+        key = tuple(pattern) if isinstance(pattern, list) else pattern
+        matcher = self.pattern_cache.get(key, None)
+        if matcher is None:
+            matcher = self.build_pattern_matcher(pattern)
+            self.pattern_cache[key] = matcher
+        return matcher
+
+    def build_pattern_matcher(self, pattern: str | list[str]) -> Callable[[str], bool]:
         if isinstance(pattern, list):
+            # Plain names and wildcards can all be checked together, only groups and inversions need their own matcher
+            plain_patterns = [pattern_item for pattern_item in pattern if not pattern_item.startswith(('!', '#'))]
             pattern_list = []
+            if plain_patterns:
+                pattern_list.append(wildcard_matcher(plain_patterns))
             for pattern_item in pattern:
-                pattern_list.append(self.pattern_matcher(pattern_item))
-            return reduce(lambda acc, sub_matcher: lambda item: sub_matcher(item) or acc(item), pattern_list, lambda _: False)
+                if pattern_item.startswith(('!', '#')):
+                    pattern_list.append(self.pattern_matcher(pattern_item))
+            if len(pattern_list) == 1:
+                return pattern_list[0]
+            sub_matchers = tuple(pattern_list)
+            return lambda s: any(sub_matcher(s) for sub_matcher in sub_matchers)
 
         invert = pattern.startswith('!')
         if invert:
@@ -350,99 +426,95 @@ class WorldDistribution:
             group = self.distribution.search_groups[pattern[1:]]
             if pattern == '#MajorItem':
                 if not self.major_group: # If necessary to compute major_group, do so only once
-                    self.major_group = [item for item in group if item in self.base_pool]
-                    # Songs included by default, remove them if songs not set to anywhere
-                    if self.distribution.settings.shuffle_song_items != "any":
-                        self.major_group = [x for x in self.major_group if x not in item_groups['Song']]
-                    # Special handling for things not included in base_pool
-                    if self.distribution.settings.triforce_hunt:
-                        self.major_group.append('Triforce Piece')
-                    major_tokens = ((self.distribution.settings.shuffle_ganon_bosskey == 'on_lacs' and
-                            self.distribution.settings.lacs_condition == 'tokens') or
-                            self.distribution.settings.shuffle_ganon_bosskey == 'tokens' or self.distribution.settings.bridge == 'tokens')
-                    if self.distribution.settings.tokensanity == 'all' and major_tokens:
-                        self.major_group.append('Gold Skulltula Token')
-                    major_hearts = ((self.distribution.settings.shuffle_ganon_bosskey == 'on_lacs' and
-                            self.distribution.settings.lacs_condition == 'hearts') or
-                            self.distribution.settings.shuffle_ganon_bosskey == 'hearts' or self.distribution.settings.bridge == 'hearts')
-                    if major_hearts:
-                        self.major_group += ['Heart Container', 'Piece of Heart', 'Piece of Heart (Treasure Chest Game)']
-                    if self.distribution.settings.shuffle_smallkeys == 'keysanity':
-                        for dungeon in ['Bottom of the Well', 'Forest Temple', 'Fire Temple', 'Water Temple',
-                                        'Shadow Temple', 'Spirit Temple', 'Gerudo Training Ground', 'Ganons Castle']:
-                            if dungeon in self.distribution.settings.key_rings:
-                                self.major_group.append(f"Small Key Ring ({dungeon})")
-                            else:
-                                self.major_group.append(f"Small Key ({dungeon})")
-                    if self.distribution.settings.shuffle_hideoutkeys == 'keysanity':
-                        if 'Thieves Hideout' in self.distribution.settings.key_rings:
-                            self.major_group.append('Small Key Ring (Thieves Hideout)')
-                        else:
-                            self.major_group.append('Small Key (Thieves Hideout)')
-                    if self.distribution.settings.shuffle_tcgkeys == 'keysanity':
-                        if 'Treasure Chest Game' in self.distribution.settings.key_rings:
-                            self.major_group.append('Small Key Ring (Treasure Chest Game)')
-                        else:
-                            self.major_group.append('Small Key (Treasure Chest Game)')
-                    if self.distribution.settings.shuffle_bosskeys == 'keysanity':
-                        keys = [name for name, item in ItemInfo.items.items() if item.type == 'BossKey' and name != 'Boss Key']
-                        self.major_group.extend(keys)
-                    if self.distribution.settings.shuffle_ganon_bosskey == 'keysanity':
-                        keys = [name for name, item in ItemInfo.items.items() if item.type == 'GanonBossKey']
-                        self.major_group.extend(keys)
-                    if self.distribution.settings.shuffle_silver_rupees == 'anywhere':
-                        rupees = [name for name, item in ItemInfo.items.items() if item.type == 'SilverRupee']
-                        self.major_group.extend(rupees)
+                    self.build_major_group()
                 group = self.major_group
+            else:
+                group = frozenset(group)
             return lambda s: invert != (s in group)
-        wildcard_begin = pattern.startswith('*')
-        if wildcard_begin:
-            pattern = pattern[1:]
-        wildcard_end = pattern.endswith('*')
-        if wildcard_end:
-            pattern = pattern[:-1]
-            if wildcard_begin:
-                return lambda s: invert != (pattern in s)
+        if not is_pattern(pattern):
+            return lambda s: invert != (s == pattern)
+        matcher = wildcard_matcher([pattern])
+        if not invert:
+            return matcher
+        return lambda s: not matcher(s)
+
+    def build_major_group(self) -> None:
+        settings = self.distribution.settings
+        major_group = [item for item in self.distribution.search_groups['MajorItem'] if item in self.base_pool]
+        # Songs included by default, remove them if songs not set to anywhere
+        if settings.shuffle_song_items != "any":
+            major_group = [x for x in major_group if x not in item_groups['Song']]
+        # Special handling for things not included in base_pool
+        if settings.triforce_hunt:
+            major_group.append('Triforce Piece')
+        ganon_bosskey = settings.shuffle_ganon_bosskey
+        if ganon_bosskey == 'on_lacs':
+            ganon_bosskey = settings.lacs_condition
+        if settings.tokensanity == 'all' and 'tokens' in (ganon_bosskey, settings.bridge):
+            major_group.append('Gold Skulltula Token')
+        if 'hearts' in (ganon_bosskey, settings.bridge):
+            major_group += ['Heart Container', 'Piece of Heart', 'Piece of Heart (Treasure Chest Game)']
+        if settings.shuffle_smallkeys == 'keysanity':
+            for dungeon in ['Bottom of the Well', 'Forest Temple', 'Fire Temple', 'Water Temple',
+                            'Shadow Temple', 'Spirit Temple', 'Gerudo Training Ground', 'Ganons Castle']:
+                if dungeon in settings.key_rings:
+                    major_group.append(f"Small Key Ring ({dungeon})")
+                else:
+                    major_group.append(f"Small Key ({dungeon})")
+        if settings.shuffle_hideoutkeys == 'keysanity':
+            if 'Thieves Hideout' in settings.key_rings:
+                major_group.append('Small Key Ring (Thieves Hideout)')
             else:
-                return lambda s: invert != s.startswith(pattern)
-        else:
-            if wildcard_begin:
-                return lambda s: invert != s.endswith(pattern)
+                major_group.append('Small Key (Thieves Hideout)')
+        if settings.shuffle_tcgkeys == 'keysanity':
+            if 'Treasure Chest Game' in settings.key_rings:
+                major_group.append('Small Key Ring (Treasure Chest Game)')
             else:
-                return lambda s: invert != (s == pattern)
+                major_group.append('Small Key (Treasure Chest Game)')
+        # Collect every shuffled key and silver rupee type in a single pass over the item table
+        major_types = set()
+        if settings.shuffle_bosskeys == 'keysanity':
+            major_types.add('BossKey')
+        if settings.shuffle_ganon_bosskey == 'keysanity':
+            major_types.add('GanonBossKey')
+        if settings.shuffle_silver_rupees == 'anywhere':
+            major_types.add('SilverRupee')
+        if major_types:
+            major_group.extend(name for name, item in ItemInfo.items.items() if item.type in major_types and name != 'Boss Key')
+        self.major_group = frozenset(major_group)
+        # Matchers built before the group was known would be stale
+        self.pattern_cache.clear()
+        self.pattern_locations_cache.clear()
 
     # adds the location entry only if there is no record for that location already
-    def add_location(self, new_location: str, new_item: str) -> None:
+    def add_location(self, new_location: str, new_item: str) -> bool:
+        # Returns False instead of adding when the location already has an entry.
+        # Plain location names reduce to a dict lookup, only pattern entries need their matcher
+        if new_location in self.locations:
+            return False
         for (location, record) in self.locations.items():
-            pattern = self.pattern_matcher(location)
-            if pattern(new_location):
-                raise KeyError('Cannot add location that already exists')
+            if isinstance(record, list) and self.pattern_matcher(location)(new_location):
+                return False
         self.locations[new_location] = LocationRecord(new_item)
+        return True
 
     def configure_dungeons(self, world: World, mq_dungeon_pool: list[str], empty_dungeon_pool: list[str]) -> tuple[int, int]:
+        remove_from_pool(mq_dungeon_pool, [name for (name, record) in self.dungeons.items() if record.mq is not None])
+        remove_from_pool(empty_dungeon_pool, [name for (name, record) in self.empty_dungeons.items() if record.empty is not None])
         dist_num_mq, dist_num_empty = 0, 0
         for (name, record) in self.dungeons.items():
-            if record.mq is not None:
-                mq_dungeon_pool.remove(name)
-                if record.mq:
-                    dist_num_mq += 1
-                    world.dungeon_mq[name] = True
+            if record.mq:
+                dist_num_mq += 1
+                world.dungeon_mq[name] = True
         for (name, record) in self.empty_dungeons.items():
-            if record.empty is not None:
-                empty_dungeon_pool.remove(name)
-                if record.empty:
-                    dist_num_empty += 1
-                    world.empty_dungeons[name].empty = True
+            if record.empty:
+                dist_num_empty += 1
+                world.empty_dungeons[name].empty = True
         return dist_num_mq, dist_num_empty
 
     def configure_trials(self, trial_pool: list[str]) -> list[str]:
-        dist_chosen = []
-        for (name, record) in self.trials.items():
-            if record.active is not None:
-                trial_pool.remove(name)
-                if record.active:
-                    dist_chosen.append(name)
-        return dist_chosen
+        remove_from_pool(trial_pool, [name for (name, record) in self.trials.items() if record.active is not None])
+        return [name for (name, record) in self.trials.items() if record.active]
 
     def configure_songs(self) -> dict[str, str]:
         dist_notes = {}
@@ -462,33 +534,54 @@ class WorldDistribution:
                 world.randomized_list.append(name)
 
     def pool_remove_item(self, pools: list[list[str | Item]], item_name: str, count: int,
-                         world_id: Optional[int] = None, use_base_pool: bool = True) -> list[str | Item]:
-        removed_items = []
-
-        base_remove_matcher = self.pattern_matcher(item_name)
-        remove_matcher = lambda item: base_remove_matcher(item) and ((item in self.base_pool) ^ (not use_base_pool))
+                         world_id: Optional[int] = None, use_base_pool: bool = True, ignore_pools: Sequence[int] = ()) -> list[str | Item]:
+        remove_matcher = self.pattern_matcher(item_name)
         if world_id is None:
-            predicate = remove_matcher
+            matches = [(pool, index, element) for (pool_index, pool) in enumerate(pools) if pool_index not in ignore_pools
+                       for index, element in enumerate(pool) if remove_matcher(element)]
         else:
-            predicate = lambda item: item.world.id == world_id and remove_matcher(item.name)
-
-        for i in range(count):
-            removed_item = pull_random_element(pools, predicate)
-            if removed_item is None:
-                if not use_base_pool:
-                    if is_item(item_name):
-                        raise KeyError('No remaining items matching "%s" to be removed.' % (item_name))
-                    else:
-                        raise KeyError('No items matching "%s"' % (item_name))
-                else:
-                    removed_items.extend(self.pool_remove_item(pools, item_name, count - i, world_id=world_id, use_base_pool=False))
-                    break
-            if use_base_pool:
-                if world_id is None:
-                    self.base_pool.remove(removed_item)
-                else:
-                    self.base_pool.remove(removed_item.name)
-            removed_items.append(removed_item)
+            matches = [(pool, index, element.name) for (pool_index, pool) in enumerate(pools) if pool_index not in ignore_pools
+                       for index, element in enumerate(pool) if element.world.id == world_id and remove_matcher(element.name)]
+
+        # Every removed item is a single random.choice over the matches still left, kept in pool order,
+        # which draws the same items as pulling them from the pools one at a time
+        def draw(candidates: list[tuple[list[str | Item], int, str]]) -> tuple[list[str | Item], int, str]:
+            pick = random.choice(range(len(candidates)))
+            if world_id is None:
+                # Names are removed with list.remove semantics, taking the first copy left in that pool
+                pool, _, name = candidates[pick]
+                pick = next(position for position, (candidate_pool, _, candidate_name) in enumerate(candidates)
+                            if candidate_pool is pool and candidate_name == name)
+            return candidates.pop(pick)
+
+        # Items from the base pool are removed first, the others are only drawn once no matching base pool item is left
+        chosen = []
+        if use_base_pool:
+            candidates = [match for match in matches if match[2] in self.base_pool]
+            while len(chosen) < count and candidates:
+                match = draw(candidates)
+                removed_name = match[2]
+                self.base_pool[removed_name] -= 1
+                if self.base_pool[removed_name] <= 0:
+                    del self.base_pool[removed_name]
+                    # The remaining copies of this item are no longer base pool items
+                    candidates = [candidate for candidate in candidates if candidate[2] != removed_name]
+                chosen.append(match)
+        if len(chosen) < count:
+            chosen_ids = {id(match) for match in chosen}
+            candidates = [match for match in matches if match[2] not in self.base_pool and id(match) not in chosen_ids]
+            while len(chosen) < count and candidates:
+                chosen.append(draw(candidates))
+
+        removed_items = [pool[index] for pool, index, _ in chosen]
+        for pool, index, _ in sorted(chosen, key=lambda choice: choice[1], reverse=True):
+            del pool[index]
+
+        if len(removed_items) < count:
+            if is_item(item_name):
+                raise KeyError('No remaining items matching "%s" to be removed.' % (item_name))
+            else:
+                raise KeyError('No items matching "%s"' % (item_name))
 
         return removed_items
 
@@ -496,10 +589,10 @@ class WorldDistribution:
         if item_name == '#Junk':
             added_items = get_junk_item(count, pool=pool, plando_pool=self.item_pool)
         elif is_pattern(item_name):
-            add_matcher = lambda item: self.pattern_matcher(item_name)(item.name)
+            add_matcher = self.pattern_matcher(item_name)
             candidates = [
-                item.name for item in ItemIterator(predicate=add_matcher)
-                if item.name not in self.item_pool or self.item_pool[item.name].count != 0
+                name for name in ItemInfo.items
+                if add_matcher(name) and (name not in self.item_pool or self.item_pool[name].count != 0)
             ]  # Only allow items to be candidates if they haven't been set to 0
             if len(candidates) == 0:
                 raise RuntimeError("Unknown item, or item set to 0 in the item pool could not be added: " + repr(item_name) + ". " + build_close_match(item_name, 'item'))
@@ -515,7 +608,7 @@ class WorldDistribution:
         return added_items
 
     def alter_pool(self, world: World, pool: list[str]) -> list[str]:
-        self.base_pool = list(pool)
+        self.base_pool = Counter(pool)
         pool_size = len(pool)
         bottle_matcher = self.pattern_matcher("#Bottle")
         adult_trade_matcher  = self.pattern_matcher("#AdultTrade")
@@ -545,8 +638,7 @@ class WorldDistribution:
                     continue
                 predicate = self.pattern_matcher(item_name)
                 pool_match = [item for item in pool if predicate(item)]
-                for item in pool_match:
-                    self.base_pool.remove(item)
+                self.base_pool -= Counter(pool_match)
 
                 add_count = record.count - len(pool_match)
                 if add_count > 0:
@@ -630,26 +722,45 @@ class WorldDistribution:
 
     def collect_starters(self, state: State) -> None:
         for (name, record) in self.starting_items.items():
+            if record.count <= 0:
+                continue
+            # State only counts the collected item, so a single instance can be collected repeatedly
+            item = ItemFactory("Bottle" if name == "Bottle with Milk (Half)" else name, state.world)
             for _ in range(record.count):
-                item = ItemFactory("Bottle" if name == "Bottle with Milk (Half)" else name, state.world)
                 state.collect(item)
 
-    def pool_replace_item(self, item_pools: list[list[Item]], item_group: str, player_id: int, new_item: str, worlds: list[World]) -> Item:
-        removed_item = self.pool_remove_item(item_pools, item_group, 1, world_id=player_id)[0]
-        item_matcher = lambda item: self.pattern_matcher(new_item)(item.name)
+    def pool_replace_item(self, item_pools: list[list[Item]], item_group: str, player_id: int, new_item: str, worlds: list[World],
+                          ignore_pools: Sequence[int] = ()) -> Item:
+        removed_item = self.pool_remove_item(item_pools, item_group, 1, world_id=player_id, ignore_pools=ignore_pools)[0]
         if self.item_pool[removed_item.name].count > 1:
             self.item_pool[removed_item.name].count -= 1
         else:
             del self.item_pool[removed_item.name]
         if new_item == "#Junk":
             if self.distribution.settings.enable_distribution_file:
-                return ItemFactory(get_junk_item(1, self.base_pool, self.item_pool))[0]
+                return ItemFactory(get_junk_item(1, list(self.base_pool.elements()), self.item_pool))[0]
             else:  # Generator settings that add junk to the pool should not be strict about the item_pool definitions
                 return ItemFactory(get_junk_item(1))[0]
-        return random.choice(list(ItemIterator(item_matcher, worlds[player_id])))
+        # Choose among the matching names so only the chosen item is built
+        matcher = self.pattern_matcher(new_item)
+        return ItemFactory(random.choice([name for name in ItemInfo.items if matcher(name)]), worlds[player_id])
 
     def set_shuffled_entrances(self, worlds: list[World], entrance_pools: dict[str, list[Entrance]], target_entrance_pools: dict[str, list[Entrance]],
                                locations_to_ensure_reachable: Iterable[Location], itempool: list[Item]) -> None:
+        # Index the pools once so each distribution entry is a lookup rather than a scan of every pool.
+        # Targets are only ever disconnected while placing, so the region index is filtered on use.
+        entrance_index: dict[str, dict[str, Entrance]] = {}
+        for pool_type, entrance_pool in entrance_pools.items():
+            entrance_index[pool_type] = {}
+            for entrance in entrance_pool:
+                entrance_index[pool_type].setdefault(entrance.name, entrance)
+        target_index: dict[str, defaultdict[str, list[Entrance]]] = {}
+        for pool_type, target_pool in target_entrance_pools.items():
+            target_index[pool_type] = defaultdict(list)
+            for target in target_pool:
+                if target.connected_region is not None:
+                    target_index[pool_type][target.connected_region.name].append(target)
+
         for (name, record) in self.entrances.items():
             if record.region is None:
                 continue
@@ -660,10 +771,9 @@ class WorldDistribution:
                 raise RuntimeError('Unknown entrance in world %d: %s. %s' % (self.id + 1, name, build_close_match(name, 'entrance', entrance_pools)))
 
             entrance_found = False
-            for pool_type, entrance_pool in entrance_pools.items():
-                try:
-                    matched_entrance = next(filter(lambda entrance: entrance.name == name, entrance_pool))
-                except StopIteration:
+            for pool_type in entrance_pools:
+                matched_entrance = entrance_index[pool_type].get(name)
+                if matched_entrance is None:
                     continue
 
                 entrance_found = True
@@ -675,8 +785,8 @@ class WorldDistribution:
 
                 target_region = record.region
 
-                matched_targets_to_region = list(filter(lambda target: target.connected_region and target.connected_region.name == target_region,
-                                                        target_entrance_pools[pool_type]))
+                matched_targets_to_region = [target for target in target_index[pool_type].get(target_region, ())
+                                             if target.connected_region is not None]
                 if not matched_targets_to_region:
                     raise RuntimeError('No entrance found to replace with %s that leads to %s in world %d' %
                                                 (matched_entrance, target_region, self.id + 1))
@@ -722,45 +832,59 @@ class WorldDistribution:
         #  e.g. "!Queen Gohma" results in "KF Kokiri Sword Chest"
         for (key, value) in pattern_dict.items():
             if is_pattern(key):
-                pattern = lambda loc: self.pattern_matcher(key)(loc.name)
-                for location in LocationIterator(pattern):
-                    yield location.name, value
+                for location_name in self.pattern_locations(key):
+                    yield location_name, value
             else:
                 yield key, value
 
-    def get_valid_items_from_record(self, itempool: list[Item], used_items: list[str], record: LocationRecord) -> list[str]:
+    def pattern_locations(self, pattern: str) -> list[str]:
+        # fill, fill_bosses, cloak and configure_gossip all expand the same pattern keys, so match the location table once
+        location_names = self.pattern_locations_cache.get(pattern, None)
+        if location_names is None:
+            matcher = self.pattern_matcher(pattern)
+            location_names = [name for name in location_table if matcher(name)]
+            self.pattern_locations_cache[pattern] = location_names
+        return location_names
+
+    def get_valid_items_from_record(self, itempool: list[Item], used_items: list[str], record: LocationRecord,
+                                    pool_index: Optional[dict[str, list[int]]] = None) -> list[str]:
         """Gets items that are valid for placement.
 
         :param itempool: a list of the item pool to search through for the record
         :param used_items: a list of the items already used from the item pool
         :param record: the item record to choose from
+        :param pool_index: the positions of each item name in the item pool, as built by index_item_pool.
+            Built from the item pool when not given.
         :return: list:
                     All items in the record that exist in the item pool but have not already been used. Can be empty.
         """
+        if pool_index is None:
+            pool_index = index_item_pool(itempool)
         valid_items = []
         predicate = self.pattern_matcher(record.item)
         if isinstance(record.item, list):
-            for choice in record.item:
-                if choice[0] == '#' and choice[1:] in item_groups:
-                    for item in itempool:
-                        if predicate(item.name):
-                            valid_items.append(choice)
-                            break
-            for item in itempool:
-                if item.name in record.item and predicate(item.name):
-                    valid_items.append(item.name)
+            group_choices = [choice for choice in record.item if choice[0] == '#' and choice[1:] in item_groups]
+            if group_choices and any(predicate(name) for name in pool_index):
+                valid_items.extend(group_choices)
+            matched_names = [name for name in set(record.item) if name in pool_index and predicate(name)]
+            # Keep the item pool order so the random choice among them is unchanged
+            valid_items.extend(itempool[index].name for index in sorted(index for name in matched_names for index in pool_index[name]))
         else:
             if record.item[0] == '#' and record.item[1:] in item_groups:
-                for item in itempool:
-                    if predicate(item.name):
-                        valid_items = [record.item]
-                        break
+                if any(predicate(name) for name in pool_index):
+                    valid_items = [record.item]
             else:
                 valid_items = [record.item]
-        if used_items is not None:
-            for used_item in used_items:
-                if used_item in valid_items:
-                    valid_items.remove(used_item)
+        if used_items:
+            # Each used item only accounts for one copy, so drop the first occurrences rather than every match
+            remaining_used = Counter(used_items)
+            unused_items = []
+            for valid_item in valid_items:
+                if remaining_used[valid_item] > 0:
+                    remaining_used[valid_item] -= 1
+                else:
+                    unused_items.append(valid_item)
+            valid_items = unused_items
 
         return valid_items
 
@@ -838,17 +962,26 @@ class WorldDistribution:
             5: The rest of the Item pool
         """
         world = worlds[self.id]
-        fillable_locations = [location for location_pool in location_pools for location in location_pool]
+        # Keyed the same way as location_matcher compares, so the "already filled" check is a set lookup
+        fillable_locations = {(location.world.id, location.name.lower()) for location_pool in location_pools for location in location_pool}
         locations = {}
         if self.locations:
+            # Sorted first so that, like the numeric seed, the fill order does not depend on how the file orders its locations
             locations = {loc: self.locations[loc] for loc in random.sample(sorted(self.locations), len(self.locations))}
         used_items = []
+        placed_advancements: list[tuple[Location, Item, int]] = []
+        # The random state after each advancement placement, so a failed fill leaves it where an immediate check would have
+        advancement_states: list[tuple] = []
+        # The world item pool is not changed while the distribution is placed, so it is only indexed once
+        pool_index = index_item_pool(world.itempool)
+        has_starting_song = any(starter.count for name, starter in world.settings.starting_items.items() if name in song_group)
         record: LocationRecord
         for (location_name, record) in self.pattern_dict_items(locations):
             if record.item is None:
                 continue
 
-            location_matcher = lambda loc: loc.world.id == world.id and loc.name.lower() == location_name.lower()
+            location_name_lower = location_name.lower()
+            location_matcher = lambda loc: loc.world.id == world.id and loc.name.lower() == location_name_lower
             location = pull_first_element(location_pools, location_matcher)
             if location is None:
                 try:
@@ -859,7 +992,7 @@ class WorldDistribution:
                     continue
                 elif location.name in world.settings.disabled_locations:
                     continue
-                elif True in (location_matcher(location) for location in fillable_locations):
+                elif (world.id, location_name_lower) in fillable_locations:
                     raise RuntimeError('Location already filled in world %d: %s' % (self.id + 1, location_name))
                 else:
                     continue
@@ -868,16 +1001,11 @@ class WorldDistribution:
             if record.item == "#Vanilla": # Get vanilla item at this location from the location table
                 valid_items.append(location_table[location_name][4])
             else: # Do normal method of getting valid items for this location
-                valid_items = self.get_valid_items_from_record(world.itempool, used_items, record)
+                valid_items = self.get_valid_items_from_record(world.itempool, used_items, record, pool_index)
             if not valid_items:
                 # Item pool values exceeded. Remove limited items from the list and choose a random value from it
-                limited_items = ['#ChildTrade', '#AdultTrade', '#Bottle']
                 if isinstance(record.item, list):
-                    allowed_choices = []
-                    for item in record.item:
-                        if item in limited_items or item in item_groups['Bottle'] or item in item_groups['AdultTrade'] or item in item_groups['ChildTrade']:
-                            continue
-                        allowed_choices.append(item)
+                    allowed_choices = [item for item in record.item if item not in limited_choices]
                     record.item = random.choices(allowed_choices)[0]
             else:  # Choices still available in item pool, choose one, mark it as a used item
                 record.item = random.choices(valid_items)[0]
@@ -886,10 +1014,10 @@ class WorldDistribution:
 
             player_id = self.id if record.player is None else record.player - 1
 
-            if record.item in item_groups['DungeonReward']:
+            if record.item in dungeon_reward_group:
                 raise RuntimeError('Cannot place dungeon reward %s in world %d in location %s.' % (record.item, self.id + 1, location_name))
 
-            if record.item == '#Junk' and location.type == 'Song' and world.settings.shuffle_song_items == 'song' and not any(name in song_list and r.count for name, r in world.settings.starting_items.items()):
+            if record.item == '#Junk' and location.type == 'Song' and world.settings.shuffle_song_items == 'song' and not has_starting_song:
                 record.item = '#JunkSong'
 
             ignore_pools = None
@@ -915,9 +1043,37 @@ class WorldDistribution:
             location.world.push_item(location, item, True)
 
             if item.advancement:
-                search = Search.max_explore([world.state for world in worlds], itertools.chain.from_iterable(item_pools))
-                if not search.can_beat_game(False):
-                    raise FillError('%s in world %d is not reachable without %s in world %d!' % (location.name, self.id + 1, item.name, player_id + 1))
+                placed_advancements.append((location, item, player_id))
+                advancement_states.append(random.getstate())
+
+        # Locking an item to a location can only make the game harder to beat, so if it is still beatable once
+        # everything is placed, it was beatable after every placement. Search once, and on failure bisect the
+        # placements to report the first one that made the game unbeatable.
+        if placed_advancements and not self.can_beat_with_placements(worlds, item_pools, placed_advancements, len(placed_advancements)):
+            low, high = 1, len(placed_advancements)
+            while low < high:
+                middle = (low + high) // 2
+                if self.can_beat_with_placements(worlds, item_pools, placed_advancements, middle):
+                    low = middle + 1
+                else:
+                    high = middle
+            location, item, player_id = placed_advancements[low - 1]
+            # The later placements would never have been made, so neither should their random draws be
+            random.setstate(advancement_states[low - 1])
+            raise FillError('%s in world %d is not reachable without %s in world %d!' % (location.name, self.id + 1, item.name, player_id + 1))
+
+    def can_beat_with_placements(self, worlds: list[World], item_pools: list[list[Item]],
+                                 placements: list[tuple[Location, Item, int]], count: int) -> bool:
+        # Only the first count placements are kept, the later ones are temporarily put back in the item pool
+        unplaced = placements[count:]
+        for location, _, _ in unplaced:
+            location.item = None
+        try:
+            itempool = itertools.chain(itertools.chain.from_iterable(item_pools), (item for _, item, _ in unplaced))
+            return Search.max_explore([world.state for world in worlds], itempool).can_beat_game(False)
+        finally:
+            for location, item, _ in unplaced:
+                location.item = item
 
     def get_item(self, ignore_pools: list[int], item_pools: list[list[Item]], location: Location, player_id: int,
                  record: LocationRecord, worlds: list[World]) -> Item:
@@ -932,16 +1088,13 @@ class WorldDistribution:
         :return: item
         """
         world = worlds[player_id]
-        if ignore_pools:
-            pool = [pool if i not in ignore_pools else [] for i, pool in enumerate(item_pools)]
-        else:
-            pool = item_pools
+        ignore_pools = ignore_pools or ()
         try:
-            item = self.pool_remove_item(pool, record.item, 1, world_id=player_id)[0]
+            item = self.pool_remove_item(item_pools, record.item, 1, world_id=player_id, ignore_pools=ignore_pools)[0]
         except KeyError:
             if location.type == 'Shop' and "Buy" in record.item:
                 try:
-                    removed_item = self.pool_remove_item(pool, "Buy *", 1, world_id=player_id)[0]
+                    removed_item = self.pool_remove_item(item_pools, "Buy *", 1, world_id=player_id, ignore_pools=ignore_pools)[0]
                     if removed_item.name in self.item_pool:
                         # Update item_pool after item is removed
                         if self.item_pool[removed_item.name].count == 1:
@@ -953,23 +1106,23 @@ class WorldDistribution:
                     raise RuntimeError(
                         'Too many shop buy items were added to world %d, and not enough shop buy items are available in the item pool to be removed.' % (
                                     self.id + 1))
-            elif record.item in item_groups['Bottle']:
+            elif record.item in bottle_group:
                 try:
-                    item = self.pool_replace_item(pool, "#Bottle", player_id, record.item, worlds)
+                    item = self.pool_replace_item(item_pools, "#Bottle", player_id, record.item, worlds, ignore_pools)
                 except KeyError:
                     raise RuntimeError(
                         'Too many bottles were added to world %d, and not enough bottles are available in the item pool to be removed.' % (
                                     self.id + 1))
-            elif record.item in item_groups['AdultTrade'] and not world.settings.adult_trade_shuffle:
+            elif record.item in adult_trade_group and not world.settings.adult_trade_shuffle:
                 try:
-                    item = self.pool_replace_item(pool, "#AdultTrade", player_id, record.item, worlds)
+                    item = self.pool_replace_item(item_pools, "#AdultTrade", player_id, record.item, worlds, ignore_pools)
                 except KeyError:
                     raise RuntimeError(
                         'Too many adult trade items were added to world %d, and not enough adult trade items are available in the item pool to be removed.' % (
                                     self.id + 1))
-            elif record.item in item_groups['ChildTrade'] and record.item not in world.settings.shuffle_child_trade:
+            elif record.item in child_trade_group and record.item not in world.settings.shuffle_child_trade:
                 try:
-                    item = self.pool_replace_item(pool, "#ChildTrade", player_id, record.item, worlds)
+                    item = self.pool_replace_item(item_pools, "#ChildTrade", player_id, record.item, worlds, ignore_pools)
                 except KeyError:
                     raise RuntimeError(
                         'Too many child trade items were added to world %d, and not enough child trade items are available in the item pool to be removed.' % (
@@ -995,10 +1148,6 @@ class WorldDistribution:
         except IndexError:
             raise RuntimeError(
                 'Unknown item %r being placed on location %s in world %d. %s' % (record.item, location, self.id + 1, build_close_match(record.item, 'item')))
-        # Ensure pool copy is persisted to real pool
-        for i, new_pool in enumerate(pool):
-            if new_pool:
-                item_pools[i] = new_pool
         return item
 
     def cloak(self, worlds: list[World], location_pools: list[list[Location]], model_pools: list[list[Item]]) -> None:
@@ -1040,11 +1189,7 @@ class WorldDistribution:
 
     def give_items(self, world: World, save_context: SaveContext) -> None:
         # copy Triforce pieces to all worlds
-        triforce_count = sum(
-            world_dist.effective_starting_items['Triforce Piece'].count
-            for world_dist in self.distribution.world_dists
-            if 'Triforce Piece' in world_dist.effective_starting_items
-        )
+        triforce_count = self.distribution.get_starting_triforce_count()
         if triforce_count > 0:
             save_context.give_item(world, 'Triforce Piece', triforce_count)
 
@@ -1062,19 +1207,14 @@ class WorldDistribution:
 
     @property
     def starting_items(self) -> dict[str, StarterRecord]:
-        data = defaultdict(lambda: StarterRecord(0))
-        world_names = ['World %d' % (i + 1) for i in range(len(self.distribution.world_dists))]
+        starting_items = self.distribution.settings.starting_items
+        world_ids = self.distribution.world_ids
 
         # For each entry here of the form 'World %d', apply that entry to that world.
         # If there are any entries that aren't of this form,
         # apply them all to each world.
-        if world_names[self.id] in self.distribution.settings.starting_items:
-            data.update(self.distribution.settings.starting_items[world_names[self.id]])
-        data.update(
-            (item_name, count)
-            for item_name, count in self.distribution.settings.starting_items.items()
-            if item_name not in world_names
-        )
+        data = dict(starting_items.get(self.distribution.world_names[self.id], {}))
+        data.update((item_name, count) for item_name, count in starting_items.items() if item_name not in world_ids)
 
         return data
 
@@ -1107,21 +1247,21 @@ class WorldDistribution:
                     skipped_locations.append(location.name)
                     world.item_added_hint_types['barren'].append(location.item.name)
         for iter_world in worlds:
-            for location in skipped_locations:
-                loc = iter_world.get_location(location)
-                if iter_world.id == world.id:
-                    self.skipped_locations.append(loc)
+            iter_skipped_locations = [iter_world.get_location(location) for location in skipped_locations]
+            if iter_world.id == world.id:
+                self.skipped_locations.extend(iter_skipped_locations)
+            for loc in iter_skipped_locations:
                 if loc.item is not None and world.id == loc.item.world.id:
                     add_starting_item_with_ammo(items, loc.item.name)
-            # With small keysy, key rings, and key rings give boss key, but boss keysy
-            # is not on, boss keys are still required in the game to open boss doors.
-            # The boss key is also shuffled in the world, but may not be reachable as
-            # logic assumes the boss key was already obtained with the free keysy keyring.
-            for dungeon in world.dungeons:
-                if (dungeon.name in world.settings.key_rings and dungeon.name != 'Ganons Castle'
-                    and dungeon.shuffle_smallkeys == 'remove' and dungeon.shuffle_bosskeys != 'remove'
-                    and world.settings.keyring_give_bk and len(dungeon.boss_key) > 0):
-                    items[dungeon.boss_key[0].name] = StarterRecord(1)
+        # With small keysy, key rings, and key rings give boss key, but boss keysy
+        # is not on, boss keys are still required in the game to open boss doors.
+        # The boss key is also shuffled in the world, but may not be reachable as
+        # logic assumes the boss key was already obtained with the free keysy keyring.
+        for dungeon in world.dungeons:
+            if (dungeon.name in world.settings.key_rings and dungeon.name != 'Ganons Castle'
+                and dungeon.shuffle_smallkeys == 'remove' and dungeon.shuffle_bosskeys != 'remove'
+                and world.settings.keyring_give_bk and len(dungeon.boss_key) > 0):
+                items[dungeon.boss_key[0].name] = StarterRecord(1)
 
         effective_adult_trade_item_index = -1
         effective_child_trade_item_index = -1
@@ -1129,18 +1269,20 @@ class WorldDistribution:
         effective_child_trade_item = None
         trade_starting_items = list(items.keys())
         for item_name in trade_starting_items:
-            if item_name in trade_items:
+            adult_trade_index = trade_item_index.get(item_name)
+            if adult_trade_index is not None:
                 if item_name in world.settings.adult_trade_start:
-                    if trade_items.index(item_name) > effective_adult_trade_item_index:
-                        effective_adult_trade_item_index = trade_items.index(item_name)
+                    if adult_trade_index > effective_adult_trade_item_index:
+                        effective_adult_trade_item_index = adult_trade_index
                         effective_adult_trade_item = items[item_name]
                 else:
                     raise RuntimeError('An unshuffled trade item was included as a starting item. Please remove %s from starting items' % item_name)
                 del items[item_name]
-            if item_name in child_trade_items:
+            child_trade_index = child_trade_item_index.get(item_name)
+            if child_trade_index is not None:
                 if item_name in world.settings.shuffle_child_trade or item_name == 'Zeldas Letter':
-                    if child_trade_items.index(item_name) > effective_child_trade_item_index:
-                        effective_child_trade_item_index = child_trade_items.index(item_name)
+                    if child_trade_index > effective_child_trade_item_index:
+                        effective_child_trade_item_index = child_trade_index
                         effective_child_trade_item = items[item_name]
                 else:
                     raise RuntimeError('An unshuffled trade item was included as a starting item. Please remove %s from starting items' % item_name)
@@ -1153,6 +1295,7 @@ class WorldDistribution:
             world.adult_trade_starting_inventory = trade_items[effective_adult_trade_item_index]
 
         self.effective_starting_items = items
+        self.distribution.starting_triforce_count = None
 
 
 class Distribution:
@@ -1160,6 +1303,7 @@ class Distribution:
         self.file_hash: Optional[list[str]] = None
         self.playthrough: Optional[dict[str, dict[str, LocationRecord]]] = None
         self.entrance_playthrough: Optional[dict[str, dict[str, EntranceRecord]]] = None
+        self.starting_triforce_count: Optional[int] = None
 
         self.src_dict: dict[str, Any] = src_dict or {}
         self.settings: Settings = settings
@@ -1174,37 +1318,43 @@ class Distribution:
                 raise ValueError('"starting_items" at the top level is no longer supported, please move it into "settings"')
 
         self.world_dists: list[WorldDistribution] = [WorldDistribution(self, id) for id in range(settings.world_count)]
+        self.world_names: list[str] = ['World %d' % (id + 1) for id in range(settings.world_count)]
+        self.world_ids: dict[str, int] = {world_name: id for id, world_name in enumerate(self.world_names)}
         # One-time init
+        plando_settings = self.src_dict.get('settings', {})
         update_dict = {
-            'file_hash': (self.src_dict.get('file_hash', []) + [None, None, None, None, None])[0:5],
+            'file_hash': (self.src_dict.get('file_hash', []) + [None] * 5)[:5],
             'playthrough': None,
             'entrance_playthrough': None,
-            '_settings': self.src_dict.get('settings', {}),
+            '_settings': plando_settings,
         }
 
         # If the plando is using the GUI-based ("legacy") starting items settings, start with a fresh starting_items dict.
-        if not update_dict['_settings'].get('starting_items', None):
-            if (update_dict['_settings'].get('starting_equipment', None) or update_dict['_settings'].get('starting_inventory', None)
-                    or update_dict['_settings'].get('starting_songs', None)):
-                update_dict['_settings']['starting_items'] = {}
+        if not plando_settings.get('starting_items', None):
+            if (plando_settings.get('starting_equipment', None) or plando_settings.get('starting_inventory', None)
+                    or plando_settings.get('starting_songs', None)):
+                plando_settings['starting_items'] = {}
 
-        self.settings.settings_dict.update(update_dict['_settings'])
+        self.settings.settings_dict.update(plando_settings)
         if 'settings' in self.src_dict:
-            validate_settings(self.src_dict['settings'])
-            self.src_dict['_settings'] = self.src_dict['settings']
-            del self.src_dict['settings']
+            validate_settings(plando_settings)
+            self.src_dict['_settings'] = self.src_dict.pop('settings')
 
         self.__dict__.update(update_dict)
 
         # Init we have to do every time we retry
         self.reset()
 
+    def set_search_group(self, name: str, group: Sequence[str]) -> None:
+        self.search_groups[name] = group
+        # Cached matchers hold on to the group they were built from
+        for world_dist in self.world_dists:
+            world_dist.pattern_cache.clear()
+
     # adds the location entry only if there is no record for that location already
     def add_location(self, new_location: str, new_item: str) -> None:
         for world_dist in self.world_dists:
-            try:
-                world_dist.add_location(new_location, new_item)
-            except KeyError:
+            if not world_dist.add_location(new_location, new_item):
                 print('Cannot place item at excluded location because it already has an item defined in the Distribution.')
 
     def fill(self, worlds: list[World], location_pools: list[list[Location]], item_pools: list[list[Item]]) -> None:
@@ -1223,12 +1373,17 @@ class Distribution:
         total_count = 0
         total_starting_count = 0
         for world in worlds:
-            world.triforce_count = world.distribution.item_pool['Triforce Piece'].count
-            if 'Triforce Piece' in world.distribution.starting_items:
-                world.triforce_count += world.distribution.starting_items['Triforce Piece'].count
-                total_starting_count += world.distribution.starting_items['Triforce Piece'].count
-            if world.skip_child_zelda and 'Song from Impa' in world.distribution.locations and world.distribution.locations['Song from Impa'].item == 'Triforce Piece':
-                total_starting_count += 1
+            world_dist = world.distribution
+            world.triforce_count = world_dist.item_pool['Triforce Piece'].count
+            # starting_items is rebuilt on every access, so it is only read once per world
+            starting_pieces = world_dist.starting_items.get('Triforce Piece')
+            if starting_pieces is not None:
+                world.triforce_count += starting_pieces.count
+                total_starting_count += starting_pieces.count
+            if world.skip_child_zelda:
+                impa_record = world_dist.locations.get('Song from Impa')
+                if impa_record is not None and impa_record.item == 'Triforce Piece':
+                    total_starting_count += 1
             total_count += world.triforce_count
 
         if total_count < worlds[0].triforce_goal:
@@ -1240,12 +1395,20 @@ class Distribution:
         for world in worlds:
             world.total_starting_triforce_count = total_starting_count # used later in Rules.py
 
+    def get_starting_triforce_count(self) -> int:
+        # Every world starts with the Triforce pieces of all worlds, so the total is only summed once
+        if self.starting_triforce_count is None:
+            self.starting_triforce_count = sum(
+                world_dist.effective_starting_items['Triforce Piece'].count
+                for world_dist in self.world_dists
+                if 'Triforce Piece' in world_dist.effective_starting_items
+            )
+        return self.starting_triforce_count
+
     def reset(self) -> None:
         for world in self.world_dists:
             world.update({}, update_all=True)
 
-        world_names = ['World %d' % (i + 1) for i in range(len(self.world_dists))]
-
         for k in per_world_keys:
             # Anything starting with ':' is output-only and we ignore it in world.update anyway.
             if k in self.src_dict and k[0] != ':':
@@ -1253,10 +1416,13 @@ class Distribution:
                     # For each entry here of the form 'World %d', apply that entry to that world.
                     # If there are any entries that aren't of this form,
                     # apply them all to each world.
-                    for world_id, world_name in enumerate(world_names):
-                        if world_name in self.src_dict[k]:
-                            self.world_dists[world_id].update({k: self.src_dict[k][world_name]})
-                    src_all = {key: val for key, val in self.src_dict[k].items() if key not in world_names}
+                    src_all = {}
+                    for key, val in self.src_dict[k].items():
+                        world_id = self.world_ids.get(key, None)
+                        if world_id is None:
+                            src_all[key] = val
+                        else:
+                            self.world_dists[world_id].update({k: val})
                     if src_all:
                         for world in self.world_dists:
                             world.update({k: src_all})
@@ -1267,11 +1433,10 @@ class Distribution:
 
         # normalize starting items to use the dictionary format
         starting_items = itertools.chain(self.settings.starting_equipment, self.settings.starting_songs, self.settings.starting_inventory)
-        data: dict[str, StarterRecord | dict[str, StarterRecord]] = defaultdict(lambda: StarterRecord(0))
+        data: dict[str, StarterRecord | dict[str, StarterRecord]] = {}
         if isinstance(self.settings.starting_items, dict) and self.settings.starting_items:
-            world_names = ['World %d' % (i + 1) for i in range(len(self.world_dists))]
             for name, record in self.settings.starting_items.items():
-                if name in world_names:
+                if name in self.world_ids:
                     data[name] = {item_name: count if isinstance(count, StarterRecord) else StarterRecord(count) for item_name, count in record.items()}
                     add_starting_ammo(data[name])
                 else:
@@ -1284,9 +1449,9 @@ class Distribution:
                     add_starting_item_with_ammo(data, item.item_name)
                 else:
                     if item.item_name == 'Rutos Letter' and self.settings.zora_fountain != 'open':
-                        data['Rutos Letter'].count += 1
+                        add_starting_item_with_ammo(data, 'Rutos Letter')
                     elif item.item_name in ['Bottle', 'Rutos Letter']:
-                        data['Bottle'].count += 1
+                        add_starting_item_with_ammo(data, 'Bottle')
                     else:
                         raise KeyError("invalid special item: {}".format(item.item_name))
             else:
@@ -1300,13 +1465,13 @@ class Distribution:
             if self.settings.item_pool_value == 'plentiful':
                 if self.settings.starting_hearts >= 20:
                     num_hearts_to_collect -= 1
-                    data['Piece of Heart'].count += 4
-                data['Heart Container'].count += num_hearts_to_collect
+                    add_starting_item_with_ammo(data, 'Piece of Heart', 4)
+                add_starting_item_with_ammo(data, 'Heart Container', num_hearts_to_collect)
             else:
                 # evenly split the difference between heart pieces and heart containers removed from the pool,
                 # removing an extra 4 pieces in case of an odd number since there's 9*4 of them but only 8 containers
-                data['Piece of Heart'].count += 4 * math.ceil(num_hearts_to_collect / 2)
-                data['Heart Container'].count += math.floor(num_hearts_to_collect / 2)
+                add_starting_item_with_ammo(data, 'Piece of Heart', 4 * ((num_hearts_to_collect + 1) // 2))
+                add_starting_item_with_ammo(data, 'Heart Container', num_hearts_to_collect // 2)
         self.settings.starting_items = data
 
     def to_json(self, include_output: bool = True, spoiler: bool = True) -> dict[str, Any]:
@@ -1316,20 +1481,19 @@ class Distribution:
             ':seed': self.settings.seed,
             ':settings_string': self.settings.settings_string,
             ':enable_distribution_file': self.settings.enable_distribution_file,
-            'settings': self.settings.to_json(),
+            'settings': self.settings.to_json() if include_output else None,
         }
 
         if spoiler:
-            world_dist_dicts = [world_dist.to_json() for world_dist in self.world_dists]
+            world_dist_dicts = [world_dist.to_json(include_output) for world_dist in self.world_dists]
             if self.settings.world_count > 1:
                 for k in per_world_keys:
-                    self_dict[k] = {}
-                    for id, world_dist_dict in enumerate(world_dist_dicts):
-                        self_dict[k]['World %d' % (id + 1)] = world_dist_dict[k]
+                    if k in world_dist_dicts[0]:
+                        self_dict[k] = {world_name: world_dist_dict[k] for (world_name, world_dist_dict) in zip(self.world_names, world_dist_dicts)}
             else:
-                self_dict.update({k: world_dist_dicts[0][k] for k in per_world_keys})
+                self_dict.update({k: world_dist_dicts[0][k] for k in per_world_keys if k in world_dist_dicts[0]})
 
-            if self.playthrough is not None:
+            if self.playthrough is not None and include_output:
                 self_dict[':playthrough'] = AlignedDict({
                     sphere_nr: SortedDict({
                         name: record.to_json() for name, record in sphere.items()
@@ -1337,7 +1501,7 @@ class Distribution:
                     for (sphere_nr, sphere) in self.playthrough.items()
                 }, depth=2)
 
-            if self.entrance_playthrough is not None and len(self.entrance_playthrough) > 0:
+            if self.entrance_playthrough is not None and len(self.entrance_playthrough) > 0 and include_output:
                 self_dict[':entrance_playthrough'] = AlignedDict({
                     sphere_nr: SortedDict({
                         name: record.to_json() for name, record in sphere.items()
@@ -1363,15 +1527,16 @@ class Distribution:
             return
 
         spoiler.parse_data()
+        single_world = len(self.world_dists) == 1
 
         for world in spoiler.worlds:
             world_dist = self.world_dists[world.id]
             world_dist.randomized_settings = {randomized_item: getattr(world.settings, randomized_item) for randomized_item in world.randomized_list}
-            world_dist.dungeons = {dung: DungeonRecord({ 'mq': world.dungeon_mq[dung] }) for dung in world.dungeon_mq}
-            world_dist.empty_dungeons = {dung: EmptyDungeonRecord({ 'empty': world.empty_dungeons[dung].empty }) for dung in world.empty_dungeons}
-            world_dist.trials = {trial: TrialRecord({ 'active': not world.skipped_trials[trial] }) for trial in world.skipped_trials}
+            world_dist.dungeons = {dung: DungeonRecord({ 'mq': mq }) for (dung, mq) in world.dungeon_mq.items()}
+            world_dist.empty_dungeons = {dung: EmptyDungeonRecord({ 'empty': empty_dungeon.empty }) for (dung, empty_dungeon) in world.empty_dungeons.items()}
+            world_dist.trials = {trial: TrialRecord({ 'active': not skipped }) for (trial, skipped) in world.skipped_trials.items()}
             if hasattr(world, 'song_notes'):
-                world_dist.songs = {song: SongRecord({ 'notes': str(world.song_notes[song]) }) for song in world.song_notes}
+                world_dist.songs = {song: SongRecord({ 'notes': str(notes) }) for (song, notes) in world.song_notes.items()}
             world_dist.entrances = {ent.name: EntranceRecord.from_entrance(ent) for ent in spoiler.entrances[world.id]}
             world_dist.locations = {loc: LocationRecord.from_item(item) for (loc, item) in spoiler.locations[world.id].items()}
             world_dist.woth_locations = {loc.name: LocationRecord.from_item(loc.item) for loc in spoiler.required_locations[world.id]}
@@ -1384,24 +1549,27 @@ class Distribution:
                         goal_text = goal.hint_text.replace('#', '')
                         goal_text = goal_text[0].upper() + goal_text[1:]
                         # Add Token/Triforce Piece/heart reachability data
-                        if goal.items[0]['name'] == 'Triforce Piece':
-                            goal_text +=  ' (' + str(goal.items[0]['quantity']) + '/' + str(world.triforce_count) + ' reachable)'
-                        if goal.items[0]['name'] == 'Gold Skulltula Token':
-                            goal_text +=  ' (' + str(goal.items[0]['quantity']) + '/100 reachable)'
-                        if goal.items[0]['name'] == 'Piece of Heart':
-                            goal_text +=  ' (' + str(goal.items[0]['quantity']) + '/68 reachable)' #TODO adjust total based on starting_hearts?
-                        world_dist.goal_locations[cat_name][goal_text] = {}
+                        goal_item = goal.items[0]
+                        if goal_item['name'] == 'Triforce Piece':
+                            goal_text +=  ' (' + str(goal_item['quantity']) + '/' + str(world.triforce_count) + ' reachable)'
+                        elif goal_item['name'] == 'Gold Skulltula Token':
+                            goal_text +=  ' (' + str(goal_item['quantity']) + '/100 reachable)'
+                        elif goal_item['name'] == 'Piece of Heart':
+                            goal_text +=  ' (' + str(goal_item['quantity']) + '/68 reachable)' #TODO adjust total based on starting_hearts?
+                        goal_dist = world_dist.goal_locations[cat_name][goal_text] = {}
                         for location_world, locations in location_worlds.items():
-                            if len(self.world_dists) == 1:
-                                world_dist.goal_locations[cat_name][goal_text] = {loc.name: LocationRecord.from_item(loc.item).to_json() for loc in locations}
+                            locs_json = {loc.name: LocationRecord.from_item(loc.item).to_json() for loc in locations}
+                            if single_world:
+                                world_dist.goal_locations[cat_name][goal_text] = locs_json
                             else:
-                                world_dist.goal_locations[cat_name][goal_text]['from World ' + str(location_world + 1)] = {loc.name: LocationRecord.from_item(loc.item).to_json() for loc in locations}
+                                goal_dist['from World ' + str(location_world + 1)] = locs_json
             world_dist.barren_regions = list(map(str, world.empty_areas))
             world_dist.gossip_stones = {}
-            for loc in spoiler.hints[world.id]:
-                hint = GossipRecord(spoiler.hints[world.id][loc].to_json())
-                if loc in gossipLocations:
-                    world_dist.gossip_stones[gossipLocations[loc].name] = hint
+            for loc, gossip_text in spoiler.hints[world.id].items():
+                hint = GossipRecord(gossip_text.to_json())
+                stone = gossipLocations.get(loc)
+                if stone is not None:
+                    world_dist.gossip_stones[stone.name] = hint
                 else:
                     world_dist.gossip_stones["0x{:04X}".format(loc)] = hint
 
@@ -1443,44 +1611,44 @@ class Distribution:
         return Distribution(settings, src_dict)
 
     def to_file(self, filename: str, output_spoiler: bool) -> None:
-        json = self.to_str(spoiler=output_spoiler)
         with open(filename, 'w', encoding='utf-8') as outfile:
-            outfile.write(json)
+            write_obj(self.to_json(spoiler=output_spoiler), outfile)
 
 
 def add_starting_ammo(starting_items: dict[str, StarterRecord]) -> None:
-    for item in StartingItems.inventory.values():
-        if item.item_name in starting_items and item.ammo:
-            for ammo, qty in item.ammo.items():
+    for item_name, item_ammo in inventory_ammo.items():
+        if item_name in starting_items:
+            for ammo, qty in item_ammo.items():
                 # Add ammo to starter record, but not overriding existing count if present
                 if ammo not in starting_items:
-                    starting_items[ammo] = StarterRecord(0)
-                    starting_items[ammo].count = qty[starting_items[item.item_name].count - 1]
+                    starting_items[ammo] = StarterRecord(qty[starting_items[item_name].count - 1])
 
 
 def add_starting_item_with_ammo(starting_items: dict[str, StarterRecord], item_name: str, count: int = 1) -> None:
-    if item_name not in starting_items:
-        starting_items[item_name] = StarterRecord(0)
-    starting_items[item_name].count += count
-    for item in StartingItems.inventory.values():
-        if item.item_name == item_name and item.ammo:
-            for ammo, qty in item.ammo.items():
-                if ammo not in starting_items:
-                    starting_items[ammo] = StarterRecord(0)
-                starting_items[ammo].count = qty[starting_items[item_name].count - 1]
-            break
+    # setdefault would build a throwaway StarterRecord for items that are already present, so records are only created when missing
+    record = starting_items.get(item_name)
+    if record is None:
+        record = starting_items[item_name] = StarterRecord(0)
+    record.count += count
+    for ammo, qty in inventory_ammo.get(item_name, {}).items():
+        if ammo in starting_items:
+            starting_items[ammo].count = qty[record.count - 1]
+        else:
+            starting_items[ammo] = StarterRecord(qty[record.count - 1])
 
 
 def strip_output_only(obj: list | dict) -> None:
-    if isinstance(obj, list):
-        for elem in obj:
-            strip_output_only(elem)
-    elif isinstance(obj, dict):
-        output_only_keys = [key for key in obj if is_output_only(key)]
-        for key in output_only_keys:
-            del obj[key]
-        for elem in obj.values():
-            strip_output_only(elem)
+    # Walked with an explicit stack rather than recursion, scalars are pushed too and simply skipped when popped
+    pending = [obj]
+    while pending:
+        obj = pending.pop()
+        if isinstance(obj, dict):
+            output_only_keys = [key for key in obj if key.startswith(':')]
+            for key in output_only_keys:
+                del obj[key]
+            pending.extend(obj.values())
+        elif isinstance(obj, list):
+            pending.extend(obj)
 
 
 def can_cloak(actual_item: Item, model: Item) -> bool:
@@ -1492,37 +1660,108 @@ def is_output_only(pattern: str) -> bool:
 
 
 def is_pattern(pattern: str) -> bool:
-    return pattern.startswith('!') or pattern.startswith('*') or pattern.startswith('#') or pattern.endswith('*')
+    return pattern.startswith(('!', '*', '#')) or pattern.endswith('*')
+
+
+def wildcard_matcher(patterns: Iterable[str]) -> Callable[[str], bool]:
+    # A leading or trailing '*' matches anything, every other character is literal.
+    # Patterns are grouped by kind so each kind is checked with a single call to a builtin string method.
+    names = set()
+    prefixes = []
+    suffixes = []
+    infixes = []
+    for pattern in patterns:
+        wildcard_begin = pattern.startswith('*')
+        if wildcard_begin:
+            pattern = pattern[1:]
+        wildcard_end = pattern.endswith('*')
+        if wildcard_end:
+            pattern = pattern[:-1]
+        if wildcard_begin and wildcard_end:
+            infixes.append(pattern)
+        elif wildcard_end:
+            prefixes.append(pattern)
+        elif wildcard_begin:
+            suffixes.append(pattern)
+        else:
+            names.add(pattern)
+
+    checks = []
+    if names:
+        checks.append(frozenset(names).__contains__)
+    if prefixes:
+        prefix_tuple = tuple(prefixes)
+        checks.append(lambda s: s.startswith(prefix_tuple))
+    if suffixes:
+        suffix_tuple = tuple(suffixes)
+        checks.append(lambda s: s.endswith(suffix_tuple))
+    if len(infixes) == 1:
+        infix = infixes[0]
+        checks.append(lambda s: infix in s)
+    elif infixes:
+        # Several infixes are searched in one pass of a compiled alternation rather than one 'in' test each
+        infix_search = re.compile('|'.join(re.escape(infix) for infix in infixes)).search
+        checks.append(lambda s: infix_search(s) is not None)
+
+    if len(checks) == 1:
+        return checks[0]
+    check_tuple = tuple(checks)
+    return lambda s: any(check(s) for check in check_tuple)
+
+
+def index_item_pool(itempool: list[Item]) -> dict[str, list[int]]:
+    pool_index = defaultdict(list)
+    for index, item in enumerate(itempool):
+        pool_index[item.name].append(index)
+    return dict(pool_index)
+
+
+def remove_from_pool(pool: list[str], names: list[str]) -> None:
+    # Filter the pool in one pass instead of a list.remove per name. The pool keeps its order,
+    # since it is later passed to random.sample and a set would make seeds depend on string hashing.
+    unknown_names = set(names).difference(pool)
+    if unknown_names:
+        raise ValueError('Unknown names in distribution: %s' % ', '.join(sorted(unknown_names)))
+    removed_names = set(names)
+    pool[:] = [name for name in pool if name not in removed_names]
 
 
 def pull_first_element(pools: list[list[Any]], predicate: Callable[[Any], bool] = lambda k: True, remove: bool = True) -> Optional[Any]:
     for pool in pools:
-        for element in pool:
+        for index, element in enumerate(pool):
             if predicate(element):
                 if remove:
-                    pool.remove(element)
+                    del pool[index]
                 return element
     return None
 
 
 def pull_random_element(pools: list[list[Any]], predicate: Callable[[Any], bool] = lambda k: True, remove: bool = True) -> Optional[Any]:
-    candidates = [(element, pool) for pool in pools for element in pool if predicate(element)]
+    if remove:
+        # Remember where each match sits so the chosen one can be popped by position without searching the pools again
+        positions = [(pool, index) for pool in pools for index, element in enumerate(pool) if predicate(element)]
+        if len(positions) == 0:
+            return None
+        pool, index = random.choice(positions)
+        return pool.pop(index)
+    candidates = [element for pool in pools for element in pool if predicate(element)]
     if len(candidates) == 0:
         return None
-    element, pool = random.choice(candidates)
-    if remove:
-        pool.remove(element)
-    return element
+    return random.choice(candidates)
 
 
 def pull_all_elements(pools: list[list[Any]], predicate: Callable[[Any], bool] = lambda k: True, remove: bool = True) -> Optional[list[Any]]:
     elements = []
     for pool in pools:
+        # Partition in one pass and rebuild the pool once, removing while iterating over it would skip the element after each match
+        kept = []
         for element in pool:
             if predicate(element):
-                if remove:
-                    pool.remove(element)
                 elements.append(element)
+            else:
+                kept.append(element)
+        if remove:
+            pool[:] = kept
 
     if len(elements) == 0:
         return None
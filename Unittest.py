@@ -3,6 +3,8 @@
 # See `python -m unittest -h` or `pytest -h` for more options.
 
 from __future__ import annotations
+import contextlib
+import io
 import json
 import logging
 import os
@@ -10,16 +12,19 @@ import random
 import re
 import unittest
 from collections import Counter, defaultdict
+from types import SimpleNamespace
 from typing import Literal, Optional, Any, overload
 
 from EntranceShuffle import EntranceShuffleError
 from Fill import ShuffleError
 from Hints import HintArea, build_misc_item_hints
-from Item import ItemInfo
+from Item import Item, ItemInfo
 from ItemPool import remove_junk_items, remove_junk_ludicrous_items, ludicrous_items_base, ludicrous_items_extended, trade_items, ludicrous_exclusions
+from JSONDump import AlignedDict, SortedDict, dump_obj, write_obj
 from LocationList import location_is_viewable
 from Main import main, resolve_settings, build_world_graphs
 from Messages import Message, read_messages, shuffle_messages
+from Plandomizer import Distribution, pull_all_elements, pull_random_element
 from Settings import Settings, get_preset_files
 from Spoiler import Spoiler
 from Rom import Rom
@@ -548,6 +553,182 @@ class TestPlandomizer(unittest.TestCase):
         distribution_file, spoiler = generate_with_plandomizer("plando-fix-broken-drops-good")
         self.assertEqual(len([sphere for sphere in spoiler[':playthrough'].values() if 'Child Spirit Temple Beyond Metal Bridges Deku Shield Pot' in sphere]), 1)
 
+    def test_pool_remove_item(self):
+        # Removing several items at once must draw the same items, in the same order, as pulling them
+        # from the pool one random.choice at a time, so plandos keep generating the same seeds
+        def pull_one_at_a_time(pool: list[str], base_pool: list[str], item_name: str, count: int) -> list[str]:
+            matcher = world_dist.pattern_matcher(item_name)
+            removed = []
+            for use_base_pool in (True, False):
+                while len(removed) < count:
+                    candidates = [item for item in pool if matcher(item) and (item in base_pool) == use_base_pool]
+                    if not candidates:
+                        break
+                    item = random.choice(candidates)
+                    pool.remove(item)
+                    if use_base_pool:
+                        base_pool.remove(item)
+                    removed.append(item)
+            return removed
+
+        world_dist = Distribution(Settings({})).world_dists[0]
+        base_pool = ['Bombs (5)', 'Arrows (10)', 'Bombs (10)', 'Bombs (5)', 'Recovery Heart', 'Bombs (20)', 'Bombs (5)', 'Deku Nuts (5)']
+        pool = ['Bombs (10)', 'Bombs (5)', 'Arrows (10)', 'Bombs (5)', 'Bombs (10)', 'Bombs (5)', 'Recovery Heart',
+                'Bombs (20)', 'Bombs (5)', 'Bombs (20)', 'Deku Nuts (5)', 'Bombs (5)', 'Arrows (10)']
+        for item_name, count in (('Bombs (5)', 1), ('Bombs (5)', 5), ('Bombs*', 3), ('Bombs*', 9), ('!Bombs*', 4), (['Arrows (10)', 'Bombs (10)'], 4)):
+            for seed in range(10):
+                with self.subTest(item_name=item_name, count=count, seed=seed):
+                    expected_pool = list(pool)
+                    expected_base_pool = list(base_pool)
+                    random.seed(seed)
+                    expected = pull_one_at_a_time(expected_pool, expected_base_pool, item_name, count)
+                    expected_state = random.getstate()
+
+                    actual_pool = list(pool)
+                    world_dist.base_pool = Counter(base_pool)
+                    random.seed(seed)
+                    self.assertEqual(world_dist.pool_remove_item([actual_pool], item_name, count), expected)
+                    self.assertEqual(actual_pool, expected_pool)
+                    self.assertEqual(dict(world_dist.base_pool), dict(Counter(expected_base_pool)))
+                    self.assertEqual(random.getstate(), expected_state)
+
+    def test_pool_remove_item_from_item_pools(self):
+        # Placed items are removed from every fill pool at once for one world. Base pool copies go first, and once
+        # they run out the draw carries on over the other matches in pool order, like pulling them one at a time
+        def pull_one_at_a_time(pools: list[list[Item]], base_pool: list[str], count: int) -> list[Item]:
+            removed = []
+            for use_base_pool in (True, False):
+                while len(removed) < count:
+                    candidates = [(item, pool) for pool in pools for item in pool
+                                  if item.world.id == 0 and item.name.startswith('Bombs') and (item.name in base_pool) == use_base_pool]
+                    if not candidates:
+                        break
+                    item, pool = random.choice(candidates)
+                    pool.remove(item)
+                    if use_base_pool:
+                        base_pool.remove(item.name)
+                    removed.append(item)
+            return removed
+
+        world_dist = Distribution(Settings({})).world_dists[0]
+        worlds = [SimpleNamespace(id=0), SimpleNamespace(id=1)]
+        base_pool = ['Bombs (5)', 'Bombs (10)', 'Bombs (5)']
+        names = [['Bombs (5)', 'Bow', 'Bombs (10)', 'Bombs (5)'], ['Bombs (20)', 'Bombs (5)', 'Bombs (10)'], ['Bombs (5)', 'Bombs (20)']]
+        for count in range(1, 8):
+            for seed in range(10):
+                with self.subTest(count=count, seed=seed):
+                    pools = [[Item(name, worlds[index % 2]) for index, name in enumerate(pool_names)] for pool_names in names]
+                    expected_pools = [list(pool) for pool in pools]
+                    expected_base_pool = list(base_pool)
+                    random.seed(seed)
+                    expected = pull_one_at_a_time(expected_pools, expected_base_pool, count)
+
+                    world_dist.base_pool = Counter(base_pool)
+                    random.seed(seed)
+                    if len(expected) < count:
+                        self.assertRaises(KeyError, world_dist.pool_remove_item, pools, 'Bombs*', count, world_id=0)
+                    else:
+                        self.assertEqual(world_dist.pool_remove_item(pools, 'Bombs*', count, world_id=0), expected)
+                        self.assertEqual(pools, expected_pools)
+                        self.assertEqual(dict(world_dist.base_pool), dict(Counter(expected_base_pool)))
+
+    def test_major_item_group(self):
+        # #MajorItem is built from the base pool as it is when the group is first matched against, after earlier removals
+        world_dist = Distribution(Settings({})).world_dists[0]
+        world_dist.base_pool = Counter(['Bow', 'Progressive Hookshot', 'Recovery Heart'])
+        world_dist.pool_remove_item([['Bow', 'Progressive Hookshot', 'Recovery Heart']], 'Progressive Hookshot', 1)
+        matcher = world_dist.pattern_matcher('#MajorItem')
+        self.assertTrue(matcher('Bow'))
+        self.assertFalse(matcher('Progressive Hookshot'))
+        self.assertFalse(matcher('Recovery Heart'))
+
+    def test_search_group_update(self):
+        # The ludicrous item pool swaps out the #Junk group, matchers built before that must not keep the old group
+        distribution = Distribution(Settings({}))
+        world_dist = distribution.world_dists[0]
+        distribution.set_search_group('Junk', remove_junk_items)
+        self.assertTrue(world_dist.pattern_matcher('#Junk')('Arrows (10)'))
+        self.assertFalse(world_dist.pattern_matcher('#Junk')('Deku Nut Capacity'))
+        distribution.set_search_group('Junk', remove_junk_ludicrous_items)
+        self.assertFalse(world_dist.pattern_matcher('#Junk')('Arrows (10)'))
+        self.assertTrue(world_dist.pattern_matcher('#Junk')('Deku Nut Capacity'))
+        self.assertTrue(world_dist.pattern_matcher(['#Junk', 'Bow'])('Deku Nut Capacity'))
+
+    def test_pull_random_element(self):
+        # Equal but distinct elements show that the drawn element itself is removed, not the first one equal to it
+        pools = [[[1], [2], [2]], [[3], [2]]]
+        matches = [pools[0][1], pools[0][2], pools[1][1]]
+        for seed in range(10):
+            with self.subTest(seed=seed):
+                random.seed(seed)
+                expected = random.choice(matches)
+                random.seed(seed)
+                pulled_pools = [list(pool) for pool in pools]
+                pulled = pull_random_element(pulled_pools, lambda e: e == [2])
+                self.assertIs(pulled, expected)
+                self.assertFalse(any(element is pulled for pool in pulled_pools for element in pool))
+                self.assertEqual(sum(len(pool) for pool in pulled_pools), 4)
+        kept_pools = [list(pool) for pool in pools]
+        self.assertIn(pull_random_element(kept_pools, lambda e: e == [2], remove=False), matches)
+        self.assertEqual(kept_pools, pools)
+        self.assertIsNone(pull_random_element(kept_pools, lambda e: e == [4]))
+
+    def test_pull_all_elements(self):
+        # Adjacent matches must all be pulled, removing them one at a time while iterating used to skip the second one
+        pools = [[1, 2, 2, 3], [2, 4]]
+        self.assertEqual(pull_all_elements(pools, lambda e: e == 2, remove=False), [2, 2, 2])
+        self.assertEqual(pools, [[1, 2, 2, 3], [2, 4]])
+        self.assertEqual(pull_all_elements(pools, lambda e: e == 2), [2, 2, 2])
+        self.assertEqual(pools, [[1, 3], [4]])
+        self.assertIsNone(pull_all_elements(pools, lambda e: e == 2))
+
+    def test_write_obj(self):
+        # Writing the distribution entry by entry must give exactly the text dump_obj builds in one go
+        _, spoiler = generate_with_plandomizer('plando-list', live_copy=True)
+        distribution_json = spoiler.settings.distribution.to_json()
+        self.assertIsInstance(distribution_json[':playthrough'], AlignedDict)
+        self.assertIsInstance(distribution_json['item_pool'], SortedDict)
+        self.assertIsInstance(distribution_json['gossip_stones'], SortedDict)
+        distribution_json[':note'] = 'Épona’s Song'
+        for ensure_ascii in (False, True):
+            with self.subTest(ensure_ascii=ensure_ascii):
+                outfile = io.StringIO()
+                write_obj(distribution_json, outfile, ensure_ascii=ensure_ascii)
+                self.assertEqual(outfile.getvalue(), dump_obj(distribution_json, ensure_ascii=ensure_ascii))
+                self.assertEqual(ensure_ascii, 'Épona' not in outfile.getvalue())
+
+    def test_add_location(self):
+        distribution = Distribution(Settings({'world_count': 2}), {
+            'locations': {
+                'KF Midos Top Left Chest': 'Bow',
+                'Deku Tree*': ['Bombs (5)'],
+            },
+        })
+        world_dist = distribution.world_dists[0]
+        self.assertTrue(world_dist.add_location('KF Midos Top Right Chest', 'Slingshot'))
+        self.assertEqual(world_dist.locations['KF Midos Top Right Chest'].item, 'Slingshot')
+        for location in ['KF Midos Top Right Chest', 'KF Midos Top Left Chest', 'Deku Tree Map Chest']:
+            with self.subTest(location):
+                self.assertFalse(world_dist.add_location(location, 'Megaton Hammer'))
+        self.assertEqual(world_dist.locations['KF Midos Top Left Chest'].item, 'Bow')
+        self.assertNotIn('Deku Tree Map Chest', world_dist.locations)
+
+        # Every world that already has the location defined reports it once
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            distribution.add_location('KF Midos Top Left Chest', 'Megaton Hammer')
+        self.assertEqual(output.getvalue().count('already has an item defined'), 2)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            distribution.add_location('KF Midos Bottom Left Chest', 'Megaton Hammer')
+        self.assertEqual(output.getvalue(), '')
+        for world_dist in distribution.world_dists:
+            self.assertEqual(world_dist.locations['KF Midos Bottom Left Chest'].item, 'Megaton Hammer')
+
+    def test_unbeatable_placement(self):
+        # The beatability check only runs after every placement, it must still blame the one that locked the game
+        with self.assertRaises(ShuffleError) as context:
+            generate_with_plandomizer("plando-unbeatable-placement", max_attempts=1)
+        self.assertEqual(str(context.exception), 'Song from Royal Familys Tomb in world 1 is not reachable without Zeldas Lullaby in world 1!')
+
 class TestHints(unittest.TestCase):
     def test_skip_zelda(self):
         # Song from Impa would be WotH, but instead of relying on random chance to get HC WotH,